@@ -14,4 +14,9 @@
 # You should have received a copy of the GNU Lesser General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
-from .parse_date_range import parse
+__version__ = "1.3.2"
+
+from .parse_date_range import parse, parse_partial, resolve, PartialDate, PartialRange
+from .parse_date_range import try_parse, parse_many, error_code, ErrorCode, DateRangeParseException
+from .cache import ParseCache
+from .ranges import DateRange, DateRangeIndex
@@ -0,0 +1,280 @@
+# daterangeparser - a Python library to parse string date ranges
+# Copyright (C) 2013  Robin Wilson
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+A table-driven matcher for the date range grammar.
+
+This accepts exactly the same strings as the parser built by ``create_parser``
+and produces the same ``PartialRange``, but without going through PyParsing.
+The vocabulary (month names, day names, separators and so on) is compiled into
+lookup tables keyed on length and upper-cased text, and the structure of the
+grammar is hard-coded in the functions below, which follow the order in which
+PyParsing tries each element. In particular, the day, month and year of a date
+may appear in any order: they are tried greedily, in the same order as the
+``Each`` expression in ``create_parser``, with no backtracking.
+"""
+
+from . import parse_date_range
+from .parse_date_range import DateRangeParseException, ErrorCode, PartialDate, PartialRange
+
+WHITESPACE = " \n\t\r"
+DIGITS = "0123456789"
+
+_tables = None
+_tables_vocabulary = None
+
+
+def literal_table(words):
+    """
+    Compiles a list of words into a table for caseless matching.
+
+    :param words: The words to match
+    :return: A list of ``(length, {upper_case_word: word})`` pairs, longest first
+    """
+    table = {}
+    for word in words:
+        table.setdefault(len(word), {}).setdefault(word.upper(), word)
+    return sorted(table.items(), reverse=True)
+
+
+def compile_tables():
+    """Compiles the grammar vocabulary into lookup tables."""
+    return {
+        'days': literal_table(parse_date_range.DAYS.split()),
+        'superscripts': literal_table(parse_date_range.SUPERSCRIPTS.split()),
+        'months': literal_table(list(parse_date_range.MONTHS.keys())),
+        'meridians': literal_table(parse_date_range.MERIDIANS.split()),
+        'separators': literal_table(parse_date_range.SEPARATORS.split()),
+        'ignorables': literal_table(parse_date_range.IGNORABLES.split()),
+        'time_separators': parse_date_range.TIME_SEPARATORS.split(),
+        'month_numbers': dict(parse_date_range.MONTHS),
+    }
+
+
+def get_tables():
+    """
+    Returns the lookup tables, compiling them the first time they are needed and
+    again whenever the vocabulary has changed.
+    """
+    global _tables, _tables_vocabulary
+    current = parse_date_range.vocabulary()
+    if _tables is None or current != _tables_vocabulary:
+        _tables = compile_tables()
+        _tables_vocabulary = current
+    return _tables
+
+
+def _match(table, text, loc):
+    # Matches the longest word in the table at loc, returning its end and the word
+    for length, words in table:
+        word = words.get(text[loc:loc + length].upper())
+        if word is not None:
+            return loc + length, word
+    return None
+
+
+def _skip_whitespace(text, loc):
+    n = len(text)
+    while loc < n and text[loc] in WHITESPACE:
+        loc += 1
+    return loc
+
+
+def _skip_ignorables(text, loc, tables):
+    while True:
+        found = _match(tables['ignorables'], text, _skip_whitespace(text, loc))
+        if found is None:
+            return loc
+        loc = found[0]
+
+
+def _skip(text, loc, tables):
+    return _skip_whitespace(text, _skip_ignorables(text, loc, tables))
+
+
+def _number(text, loc, length):
+    # Matches exactly `length` digits at loc
+    end = loc + length
+    if end > len(text):
+        return None
+    for i in range(loc, end):
+        if text[i] not in DIGITS:
+            return None
+    return end
+
+
+def _short_number(text, loc):
+    # Matches one or two digits at loc, as long as they aren't followed by another digit
+    n = len(text)
+    if loc >= n or text[loc] not in DIGITS:
+        return None
+    end = loc + 1
+    if end < n and text[end] in DIGITS:
+        end += 1
+    if end < n and text[end] in DIGITS:
+        return None
+    return end
+
+
+def _time(text, loc, tables):
+    # Times are suppressed, so this always matches, possibly without consuming anything
+    loc = _skip(text, loc, tables)
+    end = _short_number(text, loc)
+    if end is None:
+        return loc
+    end = _skip(text, end, tables)
+    if end >= len(text) or text[end] not in tables['time_separators']:
+        return loc
+    end = _short_number(text, _skip(text, end + 1, tables))
+    if end is None:
+        return loc
+    meridian = _match(tables['meridians'], text, _skip(text, end, tables))
+    return end if meridian is None else meridian[0]
+
+
+def _day_name(text, loc, tables):
+    # Day names are suppressed, so this always matches, possibly without consuming anything
+    found = _match(tables['days'], text, _skip(text, loc, tables))
+    return loc if found is None else found[0]
+
+
+def _day(text, loc, tables):
+    # Day numbers don't skip whitespace, only ignorable strings
+    loc = _skip_ignorables(text, loc, tables)
+    end = _short_number(text, loc)
+    if end is None:
+        return None
+    value = int(text[loc:end])
+    found = _match(tables['superscripts'], text, _skip_ignorables(text, end, tables))
+    if found is not None:
+        end = found[0]
+    return end, value
+
+
+def _month(text, loc, tables):
+    found = _match(tables['months'], text, _skip(text, loc, tables))
+    if found is None:
+        return None
+    end, name = found
+    end = _skip(text, end, tables)
+    if end < len(text) and text[end] == ".":
+        end += 1
+    return end, tables['month_numbers'][name.lower()]
+
+
+def _year(text, loc, tables):
+    loc = _skip(text, loc, tables)
+    end = _number(text, loc, 4)
+    if end is None:
+        return None
+    return end, int(text[loc:end])
+
+
+# The elements of a date. Day, month and year are optional, and only need to be
+# found once. Times and day names always match, and are tried twice: once at the
+# start and once at the end of the first pass over the elements.
+_TIME, _DAY_NAME, _DAY, _MONTH, _YEAR = range(5)
+_FIRST_PASS = (_TIME, _DAY_NAME, _DAY, _MONTH, _YEAR, _TIME, _DAY_NAME)
+_PARTS = (_DAY, _MONTH, _YEAR)
+
+
+def _date(text, loc, tables, any_day=False):
+    """
+    Matches a single date, returning the end position and a ``PartialDate``.
+
+    This mirrors the way PyParsing matches an ``Each`` expression: first it finds
+    the order in which the elements appear, then it matches them again in that
+    order, this time checking the day number (unless ``any_day`` is True).
+    """
+    # Find the order of the elements
+    order = []
+    remaining = list(_PARTS)
+    current = loc
+    elements = _FIRST_PASS
+    while True:
+        matched = False
+        for element in elements:
+            if element == _TIME:
+                current = _time(text, current, tables)
+            elif element == _DAY_NAME:
+                current = _day_name(text, current, tables)
+            else:
+                found = _PART_MATCHERS[element](text, current, tables)
+                if found is None:
+                    continue
+                current = found[0]
+                remaining.remove(element)
+            order.append(element)
+            matched = True
+        if not matched:
+            break
+        elements = list(remaining)
+
+    # Any elements that weren't found are tried again at the end
+    order.extend(remaining)
+
+    # Match the elements in order
+    parts = {}
+    for element in order:
+        if element == _TIME:
+            loc = _time(text, loc, tables)
+        elif element == _DAY_NAME:
+            loc = _day_name(text, loc, tables)
+        else:
+            found = _PART_MATCHERS[element](text, loc, tables)
+            if found is not None and (element != _DAY or any_day or 1 <= found[1] <= 31):
+                loc, parts[element] = found
+            elif element == _DAY:
+                loc = _skip_ignorables(text, loc, tables)
+            else:
+                loc = _skip(text, loc, tables)
+
+    return loc, PartialDate(parts.get(_DAY), parts.get(_MONTH), parts.get(_YEAR))
+
+
+_PART_MATCHERS = {_DAY: _day, _MONTH: _month, _YEAR: _year}
+
+
+def parse_partial(text, any_day=False):
+    """
+    Parses a date range string without filling in any missing information.
+
+    This is equivalent to ``parse_date_range.parse_partial`` but uses the
+    table-driven matcher rather than PyParsing.
+
+    :param text: The string to parse
+    :param any_day: If True, day numbers outside the range 1-31 are accepted
+    :return: A ``PartialRange``
+    """
+    tables = get_tables()
+    loc = _skip(text, 0, tables)
+
+    # Start date and separator, if there is one
+    start = None
+    end, start_date = _date(text, loc, tables, any_day)
+    end = _time(text, end, tables)
+    separator = _match(tables['separators'], text, _skip(text, end, tables))
+    if separator is not None:
+        loc = separator[0]
+        start = start_date
+
+    # End date, followed by the end of the string
+    loc, end_date = _date(text, loc, tables, any_day)
+    loc = _skip(text, _time(text, loc, tables), tables)
+    if loc < len(text):
+        raise DateRangeParseException(ErrorCode.GRAMMAR, text, loc, "Expected end of text")
+
+    return PartialRange(start, end_date)
@@ -0,0 +1,114 @@
+# daterangeparser - a Python library to parse string date ranges
+# Copyright (C) 2013  Robin Wilson
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Simple benchmarks for the parsing engines.
+
+Run with ``python -m daterangeparser.benchmark``.
+"""
+
+import os
+import subprocess
+import sys
+import timeit
+
+from pyparsing import ParseException
+
+from .parse_date_range import ENGINES, parse_partial
+
+SAMPLES = [
+    "27th-29th June 2010",
+    "30 May to 9th Aug",
+    "3rd Jan 1980 -- 2nd Jan 2013",
+    "Wed 23 Jan -> Sat 16 February 2013",
+    "Tuesday 29 May - Sat 2 June 2012",
+    "From 27th to 29th March 1999",
+    "1--9 Jul",
+    "14th July 1988",
+    "23rd October 7:30pm",
+    "From 07:30 18th Nov to 17:00 24th Nov",
+    "1990, Dec 29 - 1992, Dec 14",
+    "Feb 2010 - Feb 2012",
+    "1995 - 2010",
+    "27th Blah",
+    "10th Aug 12345",
+]
+
+
+def throughput(engine, texts=SAMPLES, repeat=3, number=100):
+    """
+    Measures how many strings per second an engine can parse.
+
+    :param engine: The name of the engine, as passed to ``parse_partial``
+    :param texts: The strings to parse (strings that fail to parse are included)
+    :param repeat: How many times to repeat the measurement (the best time is used)
+    :param number: How many times to parse the strings in each measurement
+    :return: The number of strings parsed per second
+    """
+    def run():
+        for text in texts:
+            try:
+                parse_partial(text, engine)
+            except ParseException:
+                pass
+
+    # Make sure any one-off set up isn't included in the timings
+    run()
+    best = min(timeit.repeat(run, repeat=repeat, number=number))
+    return len(texts) * number / best
+
+
+# Run in a fresh interpreter to measure the cost of starting up
+STARTUP_SCRIPT = """
+import time
+start = time.time()
+from daterangeparser import parse_date_range
+imported = time.time()
+parse_date_range.parse_partial("1 May 2000", %(engine)r)
+print("%%f %%f" %% (imported - start, time.time() - imported))
+"""
+
+
+def startup_time(engine, repeat=5):
+    """
+    Measures how long a fresh process takes to import the library and parse one string.
+
+    :param engine: The name of the engine, as passed to ``parse_partial``
+    :param repeat: How many processes to start (the best times are used)
+    :return: A tuple ``(import_seconds, first_parse_seconds)``
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    script = STARTUP_SCRIPT % {'engine': engine}
+    timings = []
+    for i in range(repeat):
+        output = subprocess.check_output([sys.executable, "-c", script], cwd=root)
+        timings.append(tuple(float(t) for t in output.split()))
+    return min(t[0] for t in timings), min(t[1] for t in timings)
+
+
+def main():
+    print("Throughput:")
+    for engine in ENGINES:
+        print("  %-10s %10.0f strings/s" % (engine, throughput(engine)))
+
+    print("Start up (import, first parse):")
+    for engine in ENGINES:
+        import_time, parse_time = startup_time(engine)
+        print("  %-10s %7.2f ms %7.2f ms" % (engine, import_time * 1000, parse_time * 1000))
+
+
+if __name__ == '__main__':
+    main()
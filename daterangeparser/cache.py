@@ -0,0 +1,247 @@
+# daterangeparser - a Python library to parse string date ranges
+# Copyright (C) 2013  Robin Wilson
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import datetime
+import hashlib
+import os
+import re
+import sqlite3
+import time
+
+from . import __version__, parse_date_range
+
+# SQLite limits the number of host parameters in a single statement
+_MAX_VARIABLES = 500
+
+_WHITESPACE = re.compile(r"[ \t\n\r]+")
+
+# Eviction only runs after this fraction of max_entries has been written since
+# it last ran, so the cache can grow to about this much over max_entries
+EVICTION_SLACK = 0.1
+
+_fingerprint = None
+_fingerprint_vocabulary = None
+
+
+def grammar_fingerprint():
+    """
+    Returns a string identifying the current grammar.
+
+    The fingerprint covers the library version and every word the grammar is
+    built from (see ``parse_date_range.vocabulary``), so it changes whenever
+    the grammar used by the parsing engines changes.
+    """
+    global _fingerprint, _fingerprint_vocabulary
+    current = parse_date_range.vocabulary()
+    if _fingerprint is None or current != _fingerprint_vocabulary:
+        months = current[0]
+        h = hashlib.sha1()
+        h.update(__version__.encode("utf-8"))
+        h.update(repr((sorted(months.items()),) + current[1:]).encode("utf-8"))
+        _fingerprint = h.hexdigest()
+        _fingerprint_vocabulary = current
+    return _fingerprint
+
+
+def normalize(text):
+    """
+    Normalizes a date range string for use as a cache key.
+
+    All matching in the grammar is caseless and only the presence (not the
+    amount) of whitespace matters, so the string is lowercased and runs of
+    whitespace are collapsed to a single space.
+    """
+    return _WHITESPACE.sub(" ", text).strip(" ").lower()
+
+
+class ParseCache(object):
+    """
+    A persistent cache of parse results, stored in an SQLite database.
+
+    The cache can be shared between processes and between runs: each process
+    opens its own connection to the database file, and SQLite's locking keeps
+    concurrent readers and writers consistent. Results are stored as the
+    ordinals of the start and end dates, keyed on the normalized string,
+    ``allow_implicit``, the reference year used to fill in missing years and
+    the grammar fingerprint. Entries written by a different grammar (eg. by
+    another version of the library sharing the same file) are never returned,
+    but are left in place until they are evicted.
+
+    :param path: The path of the database file (created if it doesn't exist)
+    :param max_entries: If given, the oldest entries are evicted when the cache grows
+           beyond this size. Eviction is only checked every ``EVICTION_SLACK * max_entries``
+           writes, so the cache can briefly hold slightly more entries than this.
+    :param timeout: How long to wait (in seconds) for a lock held by another process
+    """
+
+    def __init__(self, path, max_entries=None, timeout=30.0):
+        self.path = path
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self._conn = None
+        self._pid = None
+        self._unchecked_writes = 0
+        self._connection()
+
+    def _connection(self):
+        # Connections must not be shared across a fork, so open a new one
+        # whenever we find ourselves in a different process
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.timeout)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS parses "
+                         "(key TEXT PRIMARY KEY, start_ordinal INTEGER, "
+                         "end_ordinal INTEGER, written REAL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS parses_written ON parses (written)")
+            conn.commit()
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+    def _key_prefix(self, allow_implicit, year):
+        # The fingerprint is looked up on every call, as the grammar can change
+        # while the cache is open
+        if year is None:
+            year = datetime.date.today().year
+        return "%s|%d|%d|" % (grammar_fingerprint(), bool(allow_implicit), year)
+
+    def _key(self, text, allow_implicit, year):
+        return self._key_prefix(allow_implicit, year) + normalize(text)
+
+    def get(self, text, allow_implicit=True, year=None):
+        """
+        Looks up the result for a string.
+
+        :param text: The date range string
+        :param allow_implicit: The ``allow_implicit`` value the string is parsed with
+        :param year: The reference year used for missing years (defaults to the current year)
+        :return: The ``(start, end)`` tuple as returned by ``parse``, or None if the
+        string isn't in the cache.
+        """
+        row = self._connection().execute(
+            "SELECT start_ordinal, end_ordinal FROM parses WHERE key = ?",
+            (self._key(text, allow_implicit, year),)).fetchone()
+        if row is None:
+            return None
+        return _from_ordinals(row)
+
+    def prefetch(self, texts, allow_implicit=True, year=None):
+        """
+        Looks up the results for many strings at once.
+
+        :param texts: An iterable of date range strings
+        :return: A dictionary mapping each string found in the cache to its result.
+        Strings that aren't in the cache are left out.
+        """
+        prefix = self._key_prefix(allow_implicit, year)
+        keys = {}
+        for text in texts:
+            keys.setdefault(prefix + normalize(text), []).append(text)
+
+        key_list = list(keys)
+        results = {}
+        conn = self._connection()
+        for i in range(0, len(key_list), _MAX_VARIABLES):
+            chunk = key_list[i:i + _MAX_VARIABLES]
+            rows = conn.execute(
+                "SELECT key, start_ordinal, end_ordinal FROM parses WHERE key IN (%s)" %
+                ", ".join("?" * len(chunk)), chunk)
+            for key, start_ordinal, end_ordinal in rows:
+                result = _from_ordinals((start_ordinal, end_ordinal))
+                for text in keys[key]:
+                    results[text] = result
+        return results
+
+    def put(self, text, result, allow_implicit=True, year=None):
+        """
+        Stores the result for a string.
+
+        :param text: The date range string
+        :param result: The ``(start, end)`` tuple returned by ``parse``
+        """
+        self.put_many([(text, result)], allow_implicit, year)
+
+    def put_many(self, items, allow_implicit=True, year=None):
+        """
+        Stores many results in a single transaction.
+
+        :param items: An iterable of ``(text, result)`` pairs
+        """
+        now = time.time()
+        prefix = self._key_prefix(allow_implicit, year)
+        rows = [(prefix + normalize(text),) + _to_ordinals(result) + (now,)
+                for text, result in items]
+
+        conn = self._connection()
+        with conn:
+            conn.executemany("INSERT OR REPLACE INTO parses "
+                             "(key, start_ordinal, end_ordinal, written) VALUES (?, ?, ?, ?)",
+                             rows)
+            if self.max_entries is not None:
+                # Finding the oldest entries scans the whole index, so only do it occasionally
+                self._unchecked_writes += len(rows)
+                if self._unchecked_writes >= max(1, int(self.max_entries * EVICTION_SLACK)):
+                    self._unchecked_writes = 0
+                    self._evict(conn)
+
+    def evict(self, max_entries=None):
+        """
+        Removes the oldest entries so that at most ``max_entries`` remain.
+
+        :param max_entries: The number of entries to keep (defaults to the value given
+               when the cache was created)
+        """
+        conn = self._connection()
+        with conn:
+            self._evict(conn, max_entries)
+
+    def _evict(self, conn, max_entries=None):
+        if max_entries is None:
+            max_entries = self.max_entries
+        if max_entries is None:
+            return
+        conn.execute("DELETE FROM parses WHERE key IN "
+                     "(SELECT key FROM parses ORDER BY written DESC LIMIT -1 OFFSET ?)",
+                     (max_entries,))
+
+    def __len__(self):
+        return self._connection().execute("SELECT COUNT(*) FROM parses").fetchone()[0]
+
+    def clear(self):
+        """Removes all entries from the cache."""
+        conn = self._connection()
+        with conn:
+            conn.execute("DELETE FROM parses")
+
+    def close(self):
+        """Closes this process's connection to the database."""
+        if self._conn is not None and self._pid == os.getpid():
+            self._conn.close()
+        self._conn = None
+        self._pid = None
+
+
+def _to_ordinals(result):
+    start, end = result
+    return start.toordinal(), None if end is None else end.toordinal()
+
+
+def _from_ordinals(row):
+    start_ordinal, end_ordinal = row
+    start = datetime.datetime.fromordinal(start_ordinal)
+    if end_ordinal is None:
+        return start, None
+    return start, datetime.datetime.fromordinal(end_ordinal)
@@ -0,0 +1,185 @@
+# daterangeparser - a Python library to parse string date ranges
+# Copyright (C) 2013  Robin Wilson
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Fuzz testing and worst-case timings for the parsing engines.
+
+Run with ``python -m daterangeparser.fuzz``.
+"""
+
+import random
+import timeit
+
+from . import parse_date_range
+from .parse_date_range import ENGINES, try_parse
+
+# Tokens that aren't part of the grammar vocabulary, but are useful in combination with it
+EXTRA_TOKENS = ["am", "pm", ":", ".", "0", "00", "1", "5", "9", "12", "29", "31", "32", "99",
+                "123", "1999", "2010", "20101", "0999", "12:30", "7.45pm", "Feb.", "x"]
+
+# Strings used to join tokens together
+JOINERS = ["", " ", "  ", ",", ", ", "\t", "\n", "-", " - "]
+
+# Characters used for completely random strings
+CHARACTERS = "0123456789 ,.:-abcdefghijmnoprstuyJMSFDAON\u2013\u2014>"
+
+# Strings which are repeated to build long inputs
+ADVERSARIAL_UNITS = ["from ", "from", ", ", ",", "of ", "1", "1 ", "12:", "- ", "-", "--",
+                     "->", "to ", "may ", "wed ", "1st "]
+
+# Strings added to the end of long inputs
+ADVERSARIAL_SUFFIXES = ["", "1 May", " 2010", " - 9 May"]
+
+
+def vocabulary():
+    """Returns every word used by the grammar, plus some extra tokens."""
+    return (list(parse_date_range.MONTHS.keys()) + parse_date_range.DAYS.split() +
+            parse_date_range.SEPARATORS.split() + parse_date_range.IGNORABLES.split() +
+            parse_date_range.SUPERSCRIPTS.split() + EXTRA_TOKENS)
+
+
+def grammar_strings(count, seed=0, max_tokens=8):
+    """
+    Generates strings made up of words from the grammar.
+
+    :param count: The number of strings to generate
+    :param seed: The seed for the random number generator
+    :param max_tokens: The maximum number of words in each string
+    :return: A list of strings
+    """
+    rnd = random.Random(seed)
+    words = vocabulary()
+    texts = []
+    for i in range(count):
+        text = ""
+        for j in range(rnd.randint(1, max_tokens)):
+            word = rnd.choice(words)
+            if rnd.random() < 0.1:
+                word = word.upper()
+            text += (rnd.choice(JOINERS) if text else "") + word
+        texts.append(text)
+    return texts
+
+
+def random_strings(count, seed=0, max_length=20):
+    """
+    Generates strings of random characters.
+
+    :param count: The number of strings to generate
+    :param seed: The seed for the random number generator
+    :param max_length: The maximum length of each string
+    :return: A list of strings
+    """
+    rnd = random.Random(seed)
+    return ["".join(rnd.choice(CHARACTERS) for i in range(rnd.randint(0, max_length)))
+            for j in range(count)]
+
+
+def adversarial_strings(lengths=(10, 100, 1000)):
+    """
+    Generates long strings made of repeated words, which may be slow to parse.
+
+    :param lengths: The approximate lengths of the strings to generate
+    :return: A list of strings
+    """
+    texts = []
+    for unit in ADVERSARIAL_UNITS:
+        for length in lengths:
+            for suffix in ADVERSARIAL_SUFFIXES:
+                texts.append(unit * max(1, (length - len(suffix)) // len(unit)) + suffix)
+    return texts
+
+
+def outcome(text, engine='pyparsing'):
+    """Returns the result of parsing a string, or the ``ErrorCode`` if it can't be parsed."""
+    result, code = try_parse(text, engine=engine)
+    return code if result is None else result
+
+
+def differences(texts, engines=ENGINES):
+    """
+    Checks that every engine gives the same output as the default engine.
+
+    :param texts: The strings to check
+    :param engines: The engines to check
+    :return: A list of ``(text, {engine: outcome})`` for each string where the engines
+    disagree. Strings that can't be parsed have the ``ErrorCode`` as their outcome.
+    """
+    found = []
+    for text in texts:
+        expected = outcome(text)
+        outcomes = dict((engine, expected if engine == 'pyparsing' else outcome(text, engine))
+                        for engine in engines)
+        if any(result != expected for result in outcomes.values()):
+            outcomes['pyparsing'] = expected
+            found.append((text, outcomes))
+    return found
+
+
+def slowest_by_length(texts, engine='pyparsing', bucket_size=100, repeat=3):
+    """
+    Finds the slowest string to parse in each range of lengths.
+
+    :param texts: The strings to time
+    :param engine: The engine to use
+    :param bucket_size: The size of each range of lengths
+    :param repeat: How many times to time each string (the fastest time is used)
+    :return: A dictionary mapping the start of each range of lengths to a
+    ``(seconds, text)`` tuple for the slowest string in that range
+    """
+    slowest = {}
+    for text in texts:
+        seconds = min(timeit.repeat(lambda: outcome(text, engine), repeat=repeat, number=1))
+        bucket = len(text) // bucket_size * bucket_size
+        if bucket not in slowest or seconds > slowest[bucket][0]:
+            slowest[bucket] = (seconds, text)
+    return slowest
+
+
+def worst_time_per_character(slowest, min_length=1):
+    """
+    Returns the longest time per character from the results of ``slowest_by_length``.
+
+    :param slowest: The results of ``slowest_by_length``
+    :param min_length: Strings shorter than this are ignored, as the fixed cost of
+           parsing dominates their timings
+    :return: A ``(seconds_per_character, text)`` tuple
+    """
+    timings = [(seconds / len(text), text) for seconds, text in slowest.values()
+               if len(text) >= max(min_length, 1)]
+    return max(timings) if timings else (0.0, "")
+
+
+def main():
+    texts = grammar_strings(2000) + random_strings(2000) + adversarial_strings()
+
+    found = differences(texts)
+    print("%d strings checked, %d differences between engines" % (len(texts), len(found)))
+    for text, outcomes in found[:20]:
+        print("  %r: %r" % (text, outcomes))
+
+    for engine in ENGINES:
+        slowest = slowest_by_length(texts, engine, bucket_size=100)
+        print("\nSlowest strings with the %s engine:" % engine)
+        for bucket in sorted(slowest):
+            seconds, text = slowest[bucket]
+            print("  %5d-%-5d %8.2f ms  %r" % (bucket, bucket + 99, seconds * 1000, text[:40]))
+        per_char, text = worst_time_per_character(slowest, min_length=100)
+        print("  Worst time per character: %.2f us (%r)" % (per_char * 1e6, text[:40]))
+
+
+if __name__ == '__main__':
+    main()
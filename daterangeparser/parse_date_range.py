@@ -16,6 +16,7 @@
 
 import datetime
 import calendar
+from collections import Counter, namedtuple
 
 from pyparsing import ParseException, Optional, Word, oneOf, nums, stringEnd, Literal, Group
 
@@ -46,19 +47,85 @@ MONTHS = {
     'december': 12
 }
 
+# Day names, ordinal suffixes and time parts are accepted but ignored
+DAYS = ("Mon Monday Tue Tues Tuesday Wed Weds Wednesday "
+        "Thu Thur Thurs Thursday Fri Friday Sat Saturday Sun Sunday")
+SUPERSCRIPTS = "th rd st nd"
+TIME_SEPARATORS = ": ."
+MERIDIANS = "am pm"
+
+# Possible separators between the start and end of a range
+SEPARATORS = "- -- to until through till untill \u2013 \u2014 ->"
+
+# Strings to completely ignore (whitespace ignored by default)
+IGNORABLES = ", from starting beginning of"
+
+# The engines that can be used to match strings against the grammar
+ENGINES = ('pyparsing', 'automaton')
+
+_parser = None
+_parser_vocabulary = None
+
+# The parts of a date given in a string, with None for each part that was left out
+PartialDate = namedtuple('PartialDate', ['day', 'month', 'year'])
+
+# The parsed dates of a range, before any missing information is filled in.
+# start is None if the string only gave a single date.
+PartialRange = namedtuple('PartialRange', ['start', 'end'])
+
+
+class ErrorCode(object):
+    """The reasons why a string can fail to parse."""
+
+    #: The string doesn't match the grammar
+    GRAMMAR = 'grammar'
+    #: A day number is outside the range 1-31
+    INVALID_DAY = 'invalid_day'
+    #: The day, month and year don't make a valid date (eg. 30th February)
+    INVALID_DATE = 'invalid_date'
+    #: A date has no day or month, and it can't be filled in from the rest of the string
+    INCOMPLETE_DATE = 'incomplete_date'
+    #: A date has no year, and it can't be filled in (eg. the string is only a separator)
+    MISSING_YEAR = 'missing_year'
+    #: A date has no day, and allow_implicit is False
+    IMPLICIT_NOT_ALLOWED = 'implicit_not_allowed'
+    #: The string is longer than the max_length given
+    TOO_LONG = 'too_long'
+
+
+class DateRangeParseException(ParseException):
+    """
+    A ``ParseException`` with an ``ErrorCode`` describing why parsing failed.
+
+    :param code: One of the ``ErrorCode`` values
+    """
+
+    def __init__(self, code, pstr="Couldn't parse resulting datetime", loc=0, msg=None, elem=None):
+        super(DateRangeParseException, self).__init__(pstr, loc, msg, elem)
+        self.code = code
+
+
+def error_code(exception):
+    """
+    Returns the ``ErrorCode`` for an exception raised while parsing.
+
+    Plain ``ParseException`` objects come from PyParsing itself, so they are grammar errors.
+    """
+    return getattr(exception, 'code', ErrorCode.GRAMMAR)
+
 
 def check_day(tokens=None):
     """
     Converts to int and checks a day number, ensuring it is > 1 and < 31.
     """
     if not tokens:
-        raise ParseException("Couldn't parse resulting datetime")
+        raise DateRangeParseException(ErrorCode.INVALID_DAY)
 
     t = int(tokens[0])
     if 1 <= t <= 31:
         return t
     else:
-        raise ParseException("Couldn't parse resulting datetime")
+        raise DateRangeParseException(ErrorCode.INVALID_DAY)
 
 
 def month_to_number(tokens):
@@ -71,99 +138,110 @@ def month_to_number(tokens):
     return MONTHS[month_name]
 
 
-def post_process(res, allow_implicit=True):
+def to_partial(res):
     """
-    Perform post-processing on the results of the date range parsing.
-
-    At the moment this consists mainly of ensuring that any missing information is filled in.
-    For example, if no years are specified at all in the string then both years are set to the
-    current year, and if one part of the string includes no month or year then these are
-    filled in from the other part of the string.
+    Converts the results of the date range parsing into a ``PartialRange``.
 
     :param res: The results from the parsing operation, as returned by the parseString function
-    :param allow_implicit: If implicit dates are allowed
-    :return: the results with populated date information
+    :return: A ``PartialRange`` holding the day, month and year given for each date
     """
+    def partial_date(group):
+        return PartialDate(group.get('day'), group.get('month'), group.get('year'))
 
-    # Get current date
-    today = datetime.date.today()
+    start = partial_date(res.start) if 'start' in res else None
+    return PartialRange(start, partial_date(res.end))
 
-    if not allow_implicit:
-        if ('start' in res and 'day' not in res.start) or ('end' in res and 'day' not in res.end):
-            raise ParseException("Couldn't parse resulting datetime")
 
-    if 'start' not in res:
-        # We have a single date, not a range
-        res['start'] = {}
+def _to_datetime(day, month, year):
+    """Creates a datetime from the given parts, raising ParseException if they aren't a valid date."""
+    if year is None:
+        raise DateRangeParseException(ErrorCode.MISSING_YEAR)
+    if day is None or month is None:
+        raise DateRangeParseException(ErrorCode.INCOMPLETE_DATE)
 
-        if 'month' not in res.end and 'day' not in res.end:
-            # We have only got a year, so go from start to end of the year
-            res['start']['year'] = res.end.year
-            res['start']['month'] = 1
-            res['start']['day'] = 1
+    # Years are written with four digits, so anything before 1000 can't be
+    # represented in the dd/mm/yyyy format this library has always used
+    if year < 1000:
+        raise DateRangeParseException(ErrorCode.INVALID_DATE)
 
-            res['end']['month'] = 12
-            res['end']['day'] = 31
-            return res
-        elif 'month' in res.end and 'day' not in res.end:
+    try:
+        return datetime.datetime(year, month, day)
+    except ValueError:
+        raise DateRangeParseException(ErrorCode.INVALID_DATE)
 
-            if not isinstance(res.end.month, int):
-                raise ParseException("Couldn't parse resulting datetime")
 
-            # special case - treat bare month as a range from start to end of month
-            if 'year' not in res.end or res.end.year == "":
-                res['start']['year'] = today.year
-                res['end']['year'] = today.year
-            else:
-                res['start']['year'] = res.end.year
+def resolve(partial, reference_date=None, allow_implicit=True):
+    """
+    Resolves a ``PartialRange`` into start and end datetimes.
 
-            res['start']['day'] = 1
-            res['start']['month'] = res.end.month
+    This fills in any missing information. For example, if no years are specified at all in the
+    string then both years are set to the year of the reference date, and if one part of the string
+    includes no month or year then these are filled in from the other part of the string.
 
-            res['end']['day'] = calendar.monthrange(
-                res['start']['year'], res.end.month)[1]
-        else:
-            res['start']['day'] = res.end.day
-            res['start']['month'] = res.end.month
+    Resolving is cheap compared to parsing, so the same ``PartialRange`` can be resolved against many
+    reference dates without parsing the string again.
 
-            if 'year' not in res.end:
-                res['start']['year'] = today.year
-            else:
-                res['start']['year'] = res.end.year
+    :param partial: A ``PartialRange``, as returned by ``parse_partial``
+    :param reference_date: The date used to fill in missing years (defaults to today)
+    :param allow_implicit: If implicit dates are allowed
+    :return: A tuple ``(start, end)`` as returned by ``parse``
+    """
+    if reference_date is None:
+        reference_date = datetime.date.today()
+    start, end = partial
 
-            res['end'] = None
+    if not allow_implicit:
+        if (start is not None and start.day is None) or end.day is None:
+            raise DateRangeParseException(ErrorCode.IMPLICIT_NOT_ALLOWED)
 
-        return res
+    if start is None:
+        # We have a single date, not a range
+        if end.month is None and end.day is None:
+            # We have only got a year, so go from start to end of the year
+            return _to_datetime(1, 1, end.year), _to_datetime(31, 12, end.year)
 
-    if 'month' not in res.end and 'month' not in res.start and \
-            'day' not in res.end and 'day' not in res.start:
-        # No months or days given, just years
-        res['start']['month'] = 1
-        res['start']['day'] = 1
+        year = reference_date.year if end.year is None else end.year
 
-        res['end']['month'] = 12
-        res['end']['day'] = 31
-        return res
+        if end.day is None:
+            # special case - treat bare month as a range from start to end of month
+            return (_to_datetime(1, end.month, year),
+                    _to_datetime(calendar.monthrange(year, end.month)[1], end.month, year))
 
-    # Sort out years
-    if 'year' not in res.end:
-        res.end['year'] = today.year
-        res.start['year'] = today.year
-    elif 'year' not in res.start:
-        res.start['year'] = res.end.year
+        return _to_datetime(end.day, end.month, year), None
 
-    # Sort out months
-    if 'month' not in res.start:
-        res.start['month'] = res.end.month
+    if end.month is None and start.month is None and end.day is None and start.day is None:
+        # No months or days given, just years
+        start_datetime = _to_datetime(1, 1, start.year)
+        end_datetime = _to_datetime(31, 12, end.year)
+    else:
+        # Sort out years
+        if end.year is None:
+            start_year = end_year = reference_date.year
+        else:
+            end_year = end.year
+            start_year = end.year if start.year is None else start.year
+
+        # Sort out months and days
+        start_month = end.month if start.month is None else start.month
+        start_day = 1 if start.day is None else start.day
 
-    if 'day' not in res.start or res.start['day'] == '':
-        res.start['day'] = 1
+        end_day = end.day
+        if end.month is not None and end_day is None:
+            end_day = calendar.monthrange(end_year, end.month)[1]
+        end_month = start_month if end.month is None else end.month
 
-    if res.end.month and ('day' not in res.end or res.end['day'] == ''):
+        start_datetime = _to_datetime(start_day, start_month, start_year)
+        end_datetime = _to_datetime(end_day, end_month, end_year)
 
-        res.end['day'] = calendar.monthrange(res.end.year, res.end.month)[1]
+    if end_datetime < start_datetime:
+        # end is before beginning!
+        # This is probably caused by a date straddling the change of year
+        # without the year being given
+        # So, we assume that the start should be the previous year
+        start_datetime = _to_datetime(start_datetime.day, start_datetime.month,
+                                      start_datetime.year - 1)
 
-    return res
+    return start_datetime, end_datetime
 
 
 def create_parser():
@@ -171,9 +249,8 @@ def create_parser():
 
     # Day details (day number, superscript and day name)
     daynum = Word(nums, max=2)
-    superscript = oneOf("th rd st nd", caseless=True)
-    day = oneOf("Mon Monday Tue Tues Tuesday Wed Weds Wednesday "
-                "Thu Thur Thurs Thursday Fri Friday Sat Saturday Sun Sunday", caseless=True)
+    superscript = oneOf(SUPERSCRIPTS, caseless=True)
+    day = oneOf(DAYS, caseless=True)
 
     full_day_string = daynum + Optional(superscript).suppress()
     full_day_string.setParseAction(check_day)
@@ -188,8 +265,8 @@ def create_parser():
     year = Word(nums, exact=4)
     year.setParseAction(lambda tokens: int(tokens[0]))
 
-    time_sep = oneOf(": .")
-    am_pm = oneOf("am pm", caseless=True)
+    time_sep = oneOf(TIME_SEPARATORS)
+    am_pm = oneOf(MERIDIANS, caseless=True)
     hours = Word(nums, max=2)
     mins = Word(nums, max=2)
 
@@ -202,11 +279,8 @@ def create_parser():
         Optional(month("month")) & Optional(year("year")))
     )
 
-    # Possible separators
-    separator = oneOf("- -- to until through till untill \u2013 \u2014 ->", caseless=True)
-
-    # Strings to completely ignore (whitespace ignored by default)
-    ignoreable_chars = oneOf(", from starting beginning of", caseless=True)
+    separator = oneOf(SEPARATORS, caseless=True)
+    ignoreable_chars = oneOf(IGNORABLES, caseless=True)
 
     # Final putting together of everything
     daterange = (
@@ -218,7 +292,30 @@ def create_parser():
     return daterange
 
 
-def parse(text, allow_implicit=True):
+def vocabulary():
+    """
+    Returns the words the grammar is built from.
+
+    This is compared between calls to find out whether the grammar has to be
+    rebuilt, for example because a new spelling has been added to ``MONTHS``.
+    """
+    return (dict(MONTHS), DAYS, SUPERSCRIPTS, MERIDIANS, SEPARATORS, IGNORABLES, TIME_SEPARATORS)
+
+
+def get_parser():
+    """
+    Returns the PyParsing parser, creating it the first time it is needed and
+    again whenever the vocabulary has changed.
+    """
+    global _parser, _parser_vocabulary
+    current = vocabulary()
+    if _parser is None or current != _parser_vocabulary:
+        _parser = create_parser()
+        _parser_vocabulary = current
+    return _parser
+
+
+def parse(text, allow_implicit=True, cache=None, engine='pyparsing', max_length=None):
     """
     Parses a date range string and returns the start and end as datetimes.
 
@@ -241,7 +338,8 @@ def parse(text, allow_implicit=True):
     **Notes:**
 
     - If an error encountered while parsing the date range then a
-    `pyparsing.ParseException` will be raised.
+    `pyparsing.ParseException` will be raised. Use `error_code` to find out why, or
+    `try_parse` to get the reason without an exception being raised.
     - If no year is specified then the current year is used.
     - All day names are ignored, so there is no checking to see whether,
     for example, the 23rd Jan 2013 is actually a Wednesday.
@@ -255,54 +353,100 @@ def parse(text, allow_implicit=True):
     :param allow_implicit: If implicit dates are allowed. For example,
     string 'May' by default treated as range
            from May, 1st to May, 31th. Setting allow_implicit to False helps avoid it.
+    :param cache: An optional ``ParseCache`` to look up and store results in, so that
+           repeated strings are only parsed once across processes and runs.
+    :param engine: The engine used to match the string against the grammar, either
+           ``'pyparsing'`` (the default) or ``'automaton'``, which is faster but accepts
+           exactly the same strings.
+    :param max_length: If given, strings longer than this raise a ``ParseException``
+           without being parsed, to bound the time spent on untrusted input.
     :return: A tuple ``(start, end)`` where each element is a datetime object.
     If the string only defines a single date then the tuple is ``(date, None)``.
     All times in the datetime objects are set to 00:00 as this function only parses dates.
     """
-    parser = create_parser()
+    if max_length is not None and len(text) > max_length:
+        raise DateRangeParseException(ErrorCode.TOO_LONG,
+                                      "String is longer than %d characters" % max_length)
+
+    if cache is not None:
+        result = cache.get(text, allow_implicit)
+        if result is None:
+            result = parse(text, allow_implicit, engine=engine)
+            cache.put(text, result, allow_implicit)
+        return result
+
+    return resolve(parse_partial(text, engine), allow_implicit=allow_implicit)
 
-    # print text
-    result = parser.parseString(text)
-    # print result.dump()
-    # print "----------"
-    res = post_process(result, allow_implicit)
-    # print res.dump()
 
-    # Create standard dd/mm/yyyy strings and then convert to Python datetime
-    # objects
-    if 'year' not in res.start:
-        # in case only separator was given
-        raise ParseException("Couldn't parse resulting datetime")
+def parse_partial(text, engine='pyparsing'):
+    """
+    Parses a date range string without filling in any missing information.
+
+    This does the expensive grammar matching step of ``parse``. The result can be
+    stored (it only contains tuples of ints and Nones) and later turned into datetimes
+    with ``resolve``, as many times as needed and against any reference date.
+
+    :param text: The string to parse
+    :param engine: The engine used to match the string, either ``'pyparsing'`` or ``'automaton'``
+    :return: A ``PartialRange`` holding the day, month and year given for each date.
+    The ``start`` is None if the string only defines a single date.
+    """
+    if engine not in ENGINES:
+        raise ValueError("Unknown engine %r, should be one of %s" % (engine, ", ".join(ENGINES)))
 
     try:
-        start_str = "%(day)s/%(month)s/%(year)s" % res.start
-        start_datetime = datetime.datetime.strptime(start_str, "%d/%m/%Y")
-    except ValueError:
-        raise ParseException("Couldn't parse resulting datetime")
+        if engine == 'automaton':
+            from . import automaton
+            return automaton.parse_partial(text)
+        return to_partial(get_parser().parseString(text))
+    except ParseException as e:
+        if error_code(e) == ErrorCode.GRAMMAR and _has_invalid_day(text):
+            raise DateRangeParseException(ErrorCode.INVALID_DAY, text, e.loc, "Invalid day number")
+        raise
+
+
+def _has_invalid_day(text):
+    # Days outside 1-31 are rejected while matching, so both engines report them as
+    # grammar errors. The string has an invalid day if it matches without that check.
+    from . import automaton
+    try:
+        automaton.parse_partial(text, any_day=True)
+    except ParseException:
+        return False
+    return True
 
-    if res.end is None:
-        return start_datetime, None
-    elif not res.end:
-        raise ParseException("Couldn't parse resulting datetime")
-    else:
-        try:
-            if "month" not in res.end:
-                res.end["month"] = res.start["month"]
-            end_str = "%(day)s/%(month)s/%(year)s" % res.end
-            end_datetime = datetime.datetime.strptime(end_str, "%d/%m/%Y")
-        except ValueError:
-            raise ParseException("Couldn't parse resulting datetime")
-
-        if end_datetime < start_datetime:
-            # end is before beginning!
-            # This is probably caused by a date straddling the change of year
-            # without the year being given
-            # So, we assume that the start should be the previous year
-            res.start['year'] = res.start['year'] - 1
-            start_str = "%(day)s/%(month)s/%(year)s" % res.start
-            start_datetime = datetime.datetime.strptime(start_str, "%d/%m/%Y")
-
-        return start_datetime, end_datetime
+
+def try_parse(text, **kwargs):
+    """
+    Parses a date range string without raising an exception if it can't be parsed.
+
+    Takes the same arguments as ``parse``.
+
+    :return: A tuple ``(result, code)``. If the string was parsed then ``result`` is the
+    ``(start, end)`` tuple returned by ``parse`` and ``code`` is None. Otherwise ``result``
+    is None and ``code`` is the ``ErrorCode`` giving the reason.
+    """
+    try:
+        return parse(text, **kwargs), None
+    except ParseException as e:
+        return None, error_code(e)
+
+
+def parse_many(texts, **kwargs):
+    """
+    Parses many date range strings, counting the reasons for any failures.
+
+    Takes the same arguments as ``parse``.
+
+    :param texts: An iterable of strings to parse
+    :return: A tuple ``(results, counts)``, where ``results`` is a list of the
+    ``(result, code)`` tuples returned by ``try_parse`` for each string, and ``counts``
+    is a ``collections.Counter`` mapping each ``ErrorCode`` to the number of strings that
+    failed for that reason.
+    """
+    results = [try_parse(text, **kwargs) for text in texts]
+    counts = Counter(code for result, code in results if code is not None)
+    return results, counts
 
 
 def interactive_test():
@@ -312,18 +456,9 @@ def interactive_test():
         if text.lower() == 'quit':
             break
 
-        # Get the PyParsing parser
-        daterange = create_parser()
-
-        res = daterange.parseString(text)
-
-        res = post_process(res)
-
-        start_str = "%(day)s/%(month)s/%(year)s" % res.start
-        end_str = "%(day)s/%(month)s/%(year)s" % res.end
-
-        start_datetime = datetime.datetime.strptime(start_str, "%d/%m/%Y")
-        end_datetime = datetime.datetime.strptime(end_str, "%d/%m/%Y")
+        start_datetime, end_datetime = parse(text)
+        start_str = start_datetime.strftime("%d/%m/%Y")
+        end_str = end_datetime.strftime("%d/%m/%Y") if end_datetime else None
 
         print(text)
         print("From: %s" % start_str)
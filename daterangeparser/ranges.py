@@ -0,0 +1,206 @@
+# daterangeparser - a Python library to parse string date ranges
+# Copyright (C) 2013  Robin Wilson
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import datetime
+
+
+def to_ordinal(value):
+    """
+    Converts a date, datetime or ordinal to an ordinal.
+
+    Any time part of a datetime is ignored.
+    """
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.toordinal()
+    return int(value)
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError("NumPy is required to expand date ranges into arrays")
+    return numpy
+
+
+class DateRange(object):
+    """
+    A range of days, stored as the ordinals of its first and last days.
+
+    Both ends of the range are included, so a single date is a range of length 1.
+    Days are only created when the range is iterated over or expanded.
+
+    :param start: The first day, as a date, datetime or ordinal
+    :param end: The last day, as a date, datetime or ordinal (defaults to ``start``)
+    """
+    __slots__ = ('start', 'end')
+
+    def __init__(self, start, end=None):
+        self.start = to_ordinal(start)
+        self.end = self.start if end is None else to_ordinal(end)
+        if self.end < self.start:
+            raise ValueError("End of range is before the start")
+
+    @classmethod
+    def from_parse(cls, result):
+        """
+        Creates a range from the result of ``parse``.
+
+        :param result: The ``(start, end)`` tuple returned by ``parse``. If ``end`` is
+               None then the range covers the single day ``start``.
+        """
+        start, end = result
+        return cls(start, end)
+
+    @property
+    def start_date(self):
+        """The first day of the range, as a date."""
+        return datetime.date.fromordinal(self.start)
+
+    @property
+    def end_date(self):
+        """The last day of the range, as a date."""
+        return datetime.date.fromordinal(self.end)
+
+    def __len__(self):
+        return self.end - self.start + 1
+
+    def __contains__(self, value):
+        return self.start <= to_ordinal(value) <= self.end
+
+    def __iter__(self):
+        for ordinal in range(self.start, self.end + 1):
+            yield datetime.date.fromordinal(ordinal)
+
+    def overlaps(self, other):
+        """Returns True if this range has any days in common with another."""
+        return self.start <= other.end and other.start <= self.end
+
+    def intersection(self, other):
+        """Returns the range of days in both this range and another, or None if they don't overlap."""
+        if not self.overlaps(other):
+            return None
+        return DateRange(max(self.start, other.start), min(self.end, other.end))
+
+    def to_ordinals(self):
+        """Returns the ordinals of every day in the range as a NumPy array."""
+        return _numpy().arange(self.start, self.end + 1)
+
+    def __eq__(self, other):
+        if not isinstance(other, DateRange):
+            return NotImplemented
+        return self.start == other.start and self.end == other.end
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    def __hash__(self):
+        return hash((self.start, self.end))
+
+    def __repr__(self):
+        return "DateRange(%s, %s)" % (self.start_date, self.end_date)
+
+
+def expand(ranges):
+    """
+    Expands many ranges into one row per day, using NumPy.
+
+    :param ranges: A sequence of ``DateRange`` objects
+    :return: A tuple of NumPy arrays ``(indices, ordinals)``. Each day of each range
+    gives one element in both arrays: the position of the range in ``ranges``, and the
+    ordinal of the day.
+    """
+    numpy = _numpy()
+    starts = numpy.array([r.start for r in ranges], dtype=numpy.int64)
+    ends = numpy.array([r.end for r in ranges], dtype=numpy.int64)
+    lengths = ends - starts + 1
+
+    indices = numpy.repeat(numpy.arange(len(starts)), lengths)
+    # Position of each day within its own range
+    offsets = numpy.arange(lengths.sum()) - numpy.repeat(numpy.cumsum(lengths) - lengths, lengths)
+    return indices, starts[indices] + offsets
+
+
+class DateRangeIndex(object):
+    """
+    An index for finding which of many ranges contain a given day.
+
+    This is a centred interval tree: each node holds the ranges containing its
+    centre day, sorted by start and by end, and ranges entirely before or after
+    the centre are held in the left or right subtrees. Queries take
+    ``O(log n + k)`` time, where ``k`` is the number of matching ranges.
+
+    :param ranges: A sequence of ``DateRange`` objects
+    """
+
+    def __init__(self, ranges):
+        self.ranges = list(ranges)
+        self._root = self._build([(r.start, r.end, i) for i, r in enumerate(self.ranges)])
+
+    @classmethod
+    def _build(cls, items):
+        if not items:
+            return None
+
+        endpoints = sorted([start for start, end, i in items] + [end for start, end, i in items])
+        centre = endpoints[len(endpoints) // 2]
+
+        left, right, here = [], [], []
+        for item in items:
+            if item[1] < centre:
+                left.append(item)
+            elif item[0] > centre:
+                right.append(item)
+            else:
+                here.append(item)
+
+        by_start = sorted(here)
+        by_end = sorted(here, key=lambda item: item[1], reverse=True)
+        return (centre, by_start, by_end, cls._build(left), cls._build(right))
+
+    def __len__(self):
+        return len(self.ranges)
+
+    def query(self, value):
+        """
+        Finds the ranges containing a day.
+
+        :param value: The day, as a date, datetime or ordinal
+        :return: A sorted list of the positions (in the sequence passed to the index)
+        of the ranges containing the day
+        """
+        ordinal = to_ordinal(value)
+        found = []
+        node = self._root
+        while node is not None:
+            centre, by_start, by_end, left, right = node
+            if ordinal < centre:
+                for start, end, i in by_start:
+                    if start > ordinal:
+                        break
+                    found.append(i)
+                node = left
+            elif ordinal > centre:
+                for start, end, i in by_end:
+                    if end < ordinal:
+                        break
+                    found.append(i)
+                node = right
+            else:
+                found.extend(i for start, end, i in by_start)
+                node = None
+        return sorted(found)
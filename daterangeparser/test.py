@@ -16,7 +16,21 @@
 
 import unittest
 import datetime
-from .parse_date_range import parse
+import os
+import pickle
+import random
+import shutil
+import tempfile
+from . import fuzz, parse_date_range
+from .parse_date_range import parse, parse_partial, resolve, PartialDate, PartialRange
+from .parse_date_range import try_parse, parse_many, error_code, ErrorCode
+from .cache import ParseCache, normalize
+from .ranges import DateRange, DateRangeIndex, expand
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 from pyparsing import ParseException
 
 
@@ -150,3 +164,308 @@ class TestImplicitDaysParsings(unittest.TestCase):
         for test in self.tests:
             self.assertRaises(ParseException, parse, test, allow_implicit=False)
             parse(test, allow_implicit=True)
+
+
+class TestErrorCodes(unittest.TestCase):
+    tests = [
+        ("27th Blah", {}, ErrorCode.GRAMMAR),
+        ("534th Jan 2010", {}, ErrorCode.GRAMMAR),
+        ("32 Jan 2010", {}, ErrorCode.INVALID_DAY),
+        ("0 Jan 2010", {}, ErrorCode.INVALID_DAY),
+        ("1-45 May", {}, ErrorCode.INVALID_DAY),
+        ("Wed 45 May", {}, ErrorCode.INVALID_DAY),
+        ("30th Feb 2010", {}, ErrorCode.INVALID_DATE),
+        ("1 Jan 0999", {}, ErrorCode.INVALID_DATE),
+        ("14", {}, ErrorCode.INCOMPLETE_DATE),
+        ("to", {}, ErrorCode.MISSING_YEAR),
+        ("- 2016", {}, ErrorCode.MISSING_YEAR),
+        ("May", {"allow_implicit": False}, ErrorCode.IMPLICIT_NOT_ALLOWED),
+        ("1 May 2000", {"max_length": 5}, ErrorCode.TOO_LONG),
+    ]
+
+    def test_codes(self):
+        for text, kwargs, code in self.tests:
+            for engine in parse_date_range.ENGINES:
+                self.assertEqual(try_parse(text, engine=engine, **kwargs), (None, code),
+                                 "Wrong error code for string %r" % text)
+                try:
+                    parse(text, engine=engine, **kwargs)
+                except ParseException as e:
+                    self.assertEqual(error_code(e), code)
+                else:
+                    self.fail("String %r should not parse" % text)
+
+    def test_check_day(self):
+        with self.assertRaises(ParseException) as cm:
+            parse_date_range.check_day(["32"])
+        self.assertEqual(error_code(cm.exception), ErrorCode.INVALID_DAY)
+
+    def test_try_parse(self):
+        self.assertEqual(try_parse("14th July 1988"), ((datetime.datetime(1988, 7, 14), None), None))
+
+    def test_parse_many(self):
+        results, counts = parse_many(["14th July 1988", "27th Blah", "abc", "30th Feb 2010", "May"],
+                                     allow_implicit=False)
+        self.assertEqual(results[0], ((datetime.datetime(1988, 7, 14), None), None))
+        self.assertEqual(results[1], (None, ErrorCode.GRAMMAR))
+        self.assertEqual(counts, {ErrorCode.GRAMMAR: 2, ErrorCode.INVALID_DATE: 1,
+                                  ErrorCode.IMPLICIT_NOT_ALLOWED: 1})
+
+
+class TestPartialParsing(unittest.TestCase):
+    def test_partial(self):
+        self.assertEqual(parse_partial("27th-29th June 2010"),
+                         PartialRange(PartialDate(27, None, None), PartialDate(29, 6, 2010)))
+        self.assertEqual(parse_partial("Wed 23 Jan"),
+                         PartialRange(None, PartialDate(23, 1, None)))
+        self.assertRaises(ParseException, parse_partial, "27th Blah")
+
+    def test_resolve(self):
+        reference = datetime.date(2001, 6, 1)
+        self.assertEqual(resolve(parse_partial("30 May - 9th Aug"), reference),
+                         (datetime.datetime(2001, 5, 30), datetime.datetime(2001, 8, 9)))
+        self.assertEqual(resolve(parse_partial("Feb"), reference),
+                         (datetime.datetime(2001, 2, 1), datetime.datetime(2001, 2, 28)))
+        self.assertEqual(resolve(parse_partial("Feb"), datetime.date(2004, 1, 1)),
+                         (datetime.datetime(2004, 2, 1), datetime.datetime(2004, 2, 29)))
+        self.assertEqual(resolve(parse_partial("25 Dec - 2 Jan"), reference),
+                         (datetime.datetime(2000, 12, 25), datetime.datetime(2001, 1, 2)))
+        self.assertEqual(resolve(parse_partial("14th July 1988"), reference),
+                         (datetime.datetime(1988, 7, 14), None))
+
+    def test_resolve_implicit(self):
+        partial = parse_partial("June to November")
+        self.assertRaises(ParseException, resolve, partial, allow_implicit=False)
+        resolve(partial, allow_implicit=True)
+
+    def test_resolve_matches_parse(self):
+        for text, start, end in TestWorkingParsing.tests:
+            self.assertEqual(resolve(parse_partial(text)), parse(text))
+
+    def test_serializable(self):
+        partial = parse_partial("1990, Dec 29 - 1992, Dec 14")
+        self.assertEqual(pickle.loads(pickle.dumps(partial)), partial)
+        self.assertEqual(PartialRange(*[PartialDate(*d) for d in tuple(partial)]), partial)
+
+
+class TestAutomatonEngine(unittest.TestCase):
+    def assertSameResult(self, text):
+        results = []
+        for engine in ("pyparsing", "automaton"):
+            try:
+                results.append(parse_partial(text, engine))
+            except ParseException:
+                results.append(ParseException)
+        self.assertEqual(results[0], results[1], "Engines differ for string %r" % text)
+
+    def test_corpus(self):
+        texts = ([test[0] for test in TestWorkingParsing.tests] + TestFailingParsings.tests +
+                 TestImplicitDaysParsings.tests)
+        for text in texts:
+            self.assertSameResult(text)
+
+    def test_fuzzed(self):
+        # Compares the resolved results and error codes, not just the partial results
+        texts = (fuzz.grammar_strings(150) + fuzz.random_strings(100) +
+                 fuzz.adversarial_strings(lengths=(10,)))
+        self.assertEqual(fuzz.differences(texts), [])
+
+    def test_parse(self):
+        for text, start, end in TestWorkingParsing.tests:
+            self.assertEqual(parse(text, engine="automaton"), parse(text))
+        for text in TestFailingParsings.tests:
+            self.assertRaises(ParseException, parse, text, engine="automaton")
+
+    def test_vocabulary_change(self):
+        for engine in parse_date_range.ENGINES:
+            parse("1 May 2010", engine=engine)
+            parse_date_range.MONTHS['juli'] = 7
+            try:
+                self.assertEqual(parse("1 juli 2010", engine=engine),
+                                 (datetime.datetime(2010, 7, 1), None))
+            finally:
+                del parse_date_range.MONTHS['juli']
+            self.assertEqual(try_parse("1 juli 2010", engine=engine), (None, ErrorCode.GRAMMAR))
+
+    def test_unknown_engine(self):
+        self.assertRaises(ValueError, parse, "July", engine="regex")
+
+
+class TestFuzzing(unittest.TestCase):
+    # Generous bound on the time taken per character of input, so that slow paths
+    # show up without the test depending on the speed of the machine
+    max_seconds_per_character = 0.002
+
+    @unittest.skipUnless(os.environ.get("DATERANGEPARSER_TIMING_TESTS"),
+                         "Set DATERANGEPARSER_TIMING_TESTS=1 to run timing tests")
+    def test_worst_case(self):
+        texts = fuzz.adversarial_strings(lengths=(100, 500))
+        for engine in parse_date_range.ENGINES:
+            slowest = fuzz.slowest_by_length(texts, engine, repeat=1)
+            per_character, text = fuzz.worst_time_per_character(slowest, min_length=100)
+            self.assertLess(per_character, self.max_seconds_per_character,
+                            "String %r is too slow to parse with the %s engine" % (text, engine))
+
+    def test_max_length(self):
+        self.assertRaises(ParseException, parse, "1 May 2000" + " " * 100, max_length=100)
+        self.assertEqual(parse("1 May 2000", max_length=100), parse("1 May 2000"))
+
+
+class TestParseCache(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, "cache.sqlite")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_roundtrip(self):
+        cache = ParseCache(self.path)
+        self.assertIsNone(cache.get("27th-29th June 2010"))
+
+        result = parse("27th-29th June 2010", cache=cache)
+        self.assertEqual(cache.get("27TH-29th   june 2010"), result)
+        self.assertEqual(parse("27th-29th June 2010", cache=cache), result)
+        self.assertIsNone(cache.get("27th-29th June 2010", allow_implicit=False))
+        self.assertIsNone(cache.get("27th-29th June 2010", year=1999))
+
+        single = parse("14th July 1988", cache=cache)
+        self.assertEqual(single[1], None)
+        self.assertEqual(cache.get("14th July 1988"), single)
+        cache.close()
+
+        # Results persist across connections
+        self.assertEqual(ParseCache(self.path).get("27th-29th June 2010"), result)
+
+    def test_prefetch(self):
+        cache = ParseCache(self.path)
+        texts = ["Day %d" % i for i in range(1200)]
+        cache.put_many((text, (datetime.datetime(2000, 1, 1), None)) for text in texts)
+
+        found = cache.prefetch(texts + ["July"])
+        self.assertEqual(len(found), len(texts))
+        self.assertNotIn("July", found)
+        self.assertEqual(found["Day 7"], (datetime.datetime(2000, 1, 1), None))
+
+    def test_eviction(self):
+        cache = ParseCache(self.path, max_entries=10)
+        for i in range(25):
+            cache.put("Day %d" % i, (datetime.datetime(2000, 1, 1), None))
+        self.assertTrue(10 <= len(cache) <= 11)
+        self.assertIsNotNone(cache.get("Day 24"))
+        self.assertIsNone(cache.get("Day 0"))
+
+        cache.evict()
+        self.assertEqual(len(cache), 10)
+        cache.evict(3)
+        self.assertEqual(len(cache), 3)
+
+    def test_invalidation(self):
+        cache = ParseCache(self.path)
+        parse("July", cache=cache)
+        cache.close()
+
+        parse_date_range.MONTHS['juli'] = 7
+        try:
+            cache = ParseCache(self.path)
+            self.assertIsNone(cache.get("July"))
+            parse("July", cache=cache)
+            cache.close()
+        finally:
+            del parse_date_range.MONTHS['juli']
+
+        # Entries written by the other grammar are left alone
+        cache = ParseCache(self.path)
+        self.assertEqual(len(cache), 2)
+        self.assertIsNotNone(cache.get("July"))
+
+    def test_invalidation_while_open(self):
+        cache = ParseCache(self.path)
+        result = parse("1 May 2010", cache=cache)
+
+        parse_date_range.MONTHS['juli'] = 7
+        try:
+            self.assertIsNone(cache.get("1 May 2010"))
+            parse("1 juli 2010", cache=cache)
+        finally:
+            del parse_date_range.MONTHS['juli']
+
+        self.assertIsNone(cache.get("1 juli 2010"))
+        self.assertRaises(ParseException, parse, "1 juli 2010", cache=cache)
+        self.assertEqual(cache.get("1 May 2010"), result)
+
+    def test_ignorables_change_key(self):
+        cache = ParseCache(self.path)
+        key = cache._key("1 May 2010", True, 2010)
+
+        ignorables = parse_date_range.IGNORABLES
+        parse_date_range.IGNORABLES = ignorables + " on"
+        try:
+            self.assertNotEqual(cache._key("1 May 2010", True, 2010), key)
+        finally:
+            parse_date_range.IGNORABLES = ignorables
+        self.assertEqual(cache._key("1 May 2010", True, 2010), key)
+
+    def test_normalize(self):
+        self.assertEqual(normalize("  Wed\t23  JAN\n"), "wed 23 jan")
+
+
+class TestDateRange(unittest.TestCase):
+    def test_from_parse(self):
+        r = DateRange.from_parse(parse("2012-2014"))
+        self.assertEqual(len(r), 366 + 365 + 365)
+        self.assertEqual(r.start_date, datetime.date(2012, 1, 1))
+        self.assertEqual(r.end_date, datetime.date(2014, 12, 31))
+
+        single = DateRange.from_parse(parse("14th July 1988"))
+        self.assertEqual(len(single), 1)
+        self.assertEqual(list(single), [datetime.date(1988, 7, 14)])
+
+        self.assertRaises(ValueError, DateRange, datetime.date(2000, 1, 2), datetime.date(2000, 1, 1))
+
+    def test_contains(self):
+        r = DateRange.from_parse(parse("27th-29th June 2010"))
+        self.assertIn(datetime.date(2010, 6, 27), r)
+        self.assertIn(datetime.datetime(2010, 6, 29, 23, 59), r)
+        self.assertIn(datetime.date(2010, 6, 28).toordinal(), r)
+        self.assertNotIn(datetime.date(2010, 6, 30), r)
+
+    def test_overlap(self):
+        a = DateRange(datetime.date(2010, 1, 1), datetime.date(2010, 1, 31))
+        b = DateRange(datetime.date(2010, 1, 31), datetime.date(2010, 2, 5))
+        c = DateRange(datetime.date(2010, 2, 1), datetime.date(2010, 2, 5))
+        self.assertTrue(a.overlaps(b))
+        self.assertFalse(a.overlaps(c))
+        self.assertEqual(a.intersection(b), DateRange(datetime.date(2010, 1, 31)))
+        self.assertIsNone(a.intersection(c))
+
+    def test_iteration(self):
+        r = DateRange.from_parse(parse("1995 - 2010"))
+        days = iter(r)
+        self.assertEqual(next(days), datetime.date(1995, 1, 1))
+        self.assertEqual(next(days), datetime.date(1995, 1, 2))
+
+    @unittest.skipIf(numpy is None, "NumPy is not installed")
+    def test_expand(self):
+        a = DateRange(10, 12)
+        b = DateRange(20)
+        self.assertEqual(a.to_ordinals().tolist(), [10, 11, 12])
+
+        indices, ordinals = expand([a, b, a])
+        self.assertEqual(indices.tolist(), [0, 0, 0, 1, 2, 2, 2])
+        self.assertEqual(ordinals.tolist(), [10, 11, 12, 20, 10, 11, 12])
+
+    def test_index(self):
+        rnd = random.Random(0)
+        ranges = []
+        for i in range(500):
+            start = rnd.randint(0, 1000)
+            ranges.append(DateRange(start, start + rnd.choice([0, 1, 5, 30, 400])))
+        index = DateRangeIndex(ranges)
+        self.assertEqual(len(index), 500)
+
+        for ordinal in range(-5, 1500, 7):
+            expected = [i for i, r in enumerate(ranges) if ordinal in r]
+            self.assertEqual(index.query(ordinal), expected)
+
+        self.assertEqual(DateRangeIndex([]).query(datetime.date(2000, 1, 1)), [])